@@ -35,6 +35,7 @@ You have access to a PostgreSQL database with NBA statistics. Here is the schema
 **player_game_stats** — individual box scores per game
 - player_id (BIGINT, PK part), game_id (TEXT, PK part), season_id (TEXT), game_date (DATE)
 - team_id (BIGINT), team_abbr (TEXT), matchup (TEXT), wl (TEXT), min (REAL)
+- is_home (BOOLEAN), opponent_abbr (TEXT) — generated from matchup; prefer these over parsing matchup
 - fgm, fga (INT), fg_pct (REAL), fg3m, fg3a (INT), fg3_pct (REAL)
 - ftm, fta (INT), ft_pct (REAL)
 - oreb, dreb, reb, ast, stl, blk, tov, pf, pts (INT), plus_minus (REAL)
@@ -155,20 +156,20 @@ For broad "give me player props" questions with no specific stat, use UNION ALL
 SELECT display_name, '20+ PTS' as prop, games_hit, avg_val FROM (...) UNION ALL SELECT display_name, '25+ PTS' as prop, games_hit, avg_val FROM (...) ...
 ORDER BY prop, avg_val DESC LIMIT 25;
 
-12. For home/away split questions: matchup LIKE '%vs.%' = home, matchup LIKE '%@%' = away.
+12. For home/away split questions: use the is_home boolean (generated from matchup).
 
 Example — Steph Curry home vs away this season:
 SELECT
-    CASE WHEN s.matchup LIKE '%vs.%' THEN 'Home' ELSE 'Away' END AS location,
+    CASE WHEN s.is_home THEN 'Home' ELSE 'Away' END AS location,
     COUNT(*) AS games,
     ROUND(AVG(s.pts)::numeric,1) AS ppg, ROUND(AVG(s.reb)::numeric,1) AS rpg,
     ROUND(AVG(s.ast)::numeric,1) AS apg, ROUND(AVG(s.fg_pct)::numeric,3) AS fg_pct
 FROM player_game_stats s
 WHERE s.player_id = (SELECT player_id FROM players WHERE unaccent(display_name) ILIKE unaccent('%curry%'))
   AND s.season_id = '__SEASON__'
-GROUP BY CASE WHEN s.matchup LIKE '%vs.%' THEN 'Home' ELSE 'Away' END;
+GROUP BY CASE WHEN s.is_home THEN 'Home' ELSE 'Away' END;
 
-13. For matchup / opponent-specific stats: use WHERE matchup LIKE '%OPP%' (e.g., '%BOS%').
+13. For matchup / opponent-specific stats: use WHERE opponent_abbr = 'OPP' (e.g., 'BOS').
 
 Example — LeBron's averages vs Boston:
 SELECT p.display_name, COUNT(*) AS games,
@@ -177,7 +178,7 @@ SELECT p.display_name, COUNT(*) AS games,
 FROM player_game_stats s
 JOIN players p USING (player_id)
 WHERE unaccent(p.display_name) ILIKE unaccent('%lebron%')
-  AND s.matchup LIKE '%BOS%'
+  AND s.opponent_abbr = 'BOS'
 GROUP BY p.display_name;
 
 14. For trending / hot-cold / momentum questions, compare last 5 vs last 15 vs season using FILTER:
@@ -5,9 +5,13 @@ wrapper raises instead of spending more, so an unattended deployment cannot
 run up an open-ended bill.
 """
 
+import asyncio
+import hashlib
+import json
 import logging
 import time
 
+import httpx
 from openai import AsyncOpenAI
 
 from app.config import settings
@@ -16,6 +20,15 @@ logger = logging.getLogger(__name__)
 
 _client: AsyncOpenAI | None = None
 
+# Bound in-flight OpenAI calls explicitly rather than leaning on connection
+# limits — queued coroutines are cheaper than queued sockets.
+_semaphore = asyncio.Semaphore(200)
+
+# Identical prompts arriving while the first is still in flight (double-click,
+# client retry) share one task instead of spending twice. Only holds calls
+# currently in flight — no TTL, no response cache.
+_inflight_calls: dict[bytes, asyncio.Task] = {}
+
 
 class LLMBudgetExceeded(RuntimeError):
     """Raised when the daily LLM budget is spent."""
@@ -86,26 +99,37 @@ def usage_snapshot() -> dict:
 
 
 def _get_client() -> AsyncOpenAI:
+    """One process-wide client: every chat_completion/embed_text call reuses
+    the same keep-alive HTTP/2 pool instead of paying a fresh TLS handshake.
+    Lazy init is safe — the event loop is single-threaded."""
     global _client
     if _client is None:
-        _client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        _client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            max_retries=2,
+            http_client=httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=1000, max_keepalive_connections=200
+                ),
+                timeout=httpx.Timeout(30.0, connect=5.0),
+            ),
+        )
     return _client
 
 
-async def chat_completion(
-    messages: list[dict],
-    model: str = "gpt-4o",
-    temperature: float = 0.0,
-    max_tokens: int = 2048,
+async def _chat_completion_raw(
+    messages: list[dict], model: str, temperature: float, max_tokens: int
 ) -> str:
     _check_budget()
     client = _get_client()
-    resp = await client.chat.completions.create(
-        model=model,
-        messages=messages,
-        temperature=temperature,
-        max_tokens=max_tokens,
-    )
+    async with _semaphore:
+        resp = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
     usage = getattr(resp, "usage", None)
     _record(model,
             getattr(usage, "prompt_tokens", 0) or 0,
@@ -113,10 +137,46 @@ async def chat_completion(
     return resp.choices[0].message.content or ""
 
 
+async def chat_completion(
+    messages: list[dict],
+    model: str = "gpt-4o",
+    temperature: float = 0.0,
+    max_tokens: int = 2048,
+) -> str:
+    # Coalescing is only sound for deterministic calls; anything sampled at
+    # temperature > 0 legitimately wants an independent draw.
+    if temperature != 0.0:
+        return await _chat_completion_raw(messages, model, temperature, max_tokens)
+
+    key = hashlib.blake2b(
+        json.dumps([model, temperature, max_tokens, messages],
+                   sort_keys=True, ensure_ascii=False).encode()
+    ).digest()[:16]
+
+    task = _inflight_calls.get(key)
+    if task is None:
+        # The upstream call runs as its own task so a cancelled caller (client
+        # disconnect) doesn't take the shared result down with it.
+        task = asyncio.create_task(
+            _chat_completion_raw(messages, model, temperature, max_tokens)
+        )
+        _inflight_calls[key] = task
+
+        def _cleanup(t: asyncio.Task) -> None:
+            _inflight_calls.pop(key, None)
+            if not t.cancelled():
+                t.exception()  # mark retrieved even if every caller went away
+
+        task.add_done_callback(_cleanup)
+
+    return await asyncio.shield(task)
+
+
 async def embed_text(text: str, model: str = "text-embedding-3-small") -> list[float]:
     _check_budget()
     client = _get_client()
-    resp = await client.embeddings.create(model=model, input=text)
+    async with _semaphore:
+        resp = await client.embeddings.create(model=model, input=text)
     usage = getattr(resp, "usage", None)
     _record(model, getattr(usage, "prompt_tokens", 0) or 0, 0, is_embedding=True)
     return resp.data[0].embedding
@@ -3,19 +3,72 @@ import logging
 import time
 from datetime import datetime, timedelta
 
+import httpx
+
 logger = logging.getLogger(__name__)
 
+# stats.nba.com rejects requests without browser-ish headers; these mirror
+# what nba_api sends. The CDN live scoreboard doesn't care, but sending the
+# same set everywhere keeps one client for both hosts.
+_NBA_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
+    ),
+    "Referer": "https://stats.nba.com/",
+    "Accept": "application/json, text/plain, */*",
+    "x-nba-stats-origin": "stats",
+    "x-nba-stats-token": "true",
+}
+
+# One pooled async client for the whole process: keep-alive across requests,
+# no thread handoff, no per-call TLS handshake.
+_http = httpx.AsyncClient(
+    headers=_NBA_HEADERS,
+    limits=httpx.Limits(max_keepalive_connections=20),
+    timeout=25.0,
+)
+
+_LIVE_SCOREBOARD_URL = (
+    "https://cdn.nba.com/static/json/liveData/scoreboard/todaysScoreboard_00.json"
+)
+_SCOREBOARD_V2_URL = "https://stats.nba.com/stats/scoreboardv2"
+
 # Module-level cache: (timestamp, data)
 _cache: tuple[float, dict] | None = None
 _CACHE_TTL = 120  # seconds
-
-
-def _fetch_scoreboard_today() -> dict:
-    """Fetch today's live/completed games using nba_api."""
-    from nba_api.live.nba.endpoints import scoreboard
-
-    sb = scoreboard.ScoreBoard()
-    data = sb.get_dict()
+_STALE_TTL = _CACHE_TTL * 5  # serve a stale cache up to this age while refreshing
+
+# Single-flight: when the cache is cold, one caller does the NBA round
+# trip and everyone who arrives meanwhile awaits the same Future instead of
+# stampeding the external API.
+_inflight: asyncio.Future | None = None
+
+# Keep a strong reference to the background refresh task — the event loop
+# only holds weak refs, so an anonymous create_task can be GC'd mid-flight.
+_bg_refresh: asyncio.Task | None = None
+
+# ScoreboardV2 game_header has team IDs but not abbreviations — map them
+# statically, built once at import.
+_TEAM_ID_TO_ABBR: dict[int, str] = {
+    1610612737: "ATL", 1610612738: "BOS", 1610612751: "BKN",
+    1610612766: "CHA", 1610612741: "CHI", 1610612739: "CLE",
+    1610612742: "DAL", 1610612743: "DEN", 1610612765: "DET",
+    1610612744: "GSW", 1610612745: "HOU", 1610612754: "IND",
+    1610612746: "LAC", 1610612747: "LAL", 1610612763: "MEM",
+    1610612748: "MIA", 1610612749: "MIL", 1610612750: "MIN",
+    1610612740: "NOP", 1610612752: "NYK", 1610612760: "OKC",
+    1610612753: "ORL", 1610612755: "PHI", 1610612756: "PHX",
+    1610612757: "POR", 1610612758: "SAC", 1610612759: "SAS",
+    1610612761: "TOR", 1610612762: "UTA", 1610612764: "WAS",
+}
+
+
+async def _fetch_scoreboard_today() -> dict:
+    """Fetch today's live/completed games from the NBA live-data CDN."""
+    resp = await _http.get(_LIVE_SCOREBOARD_URL)
+    resp.raise_for_status()
+    data = resp.json()
 
     games = []
     for g in data.get("scoreboard", {}).get("games", []):
@@ -34,44 +87,40 @@ def _fetch_scoreboard_today() -> dict:
     return {"games": games, "label": "Today", "context": "live"}
 
 
-def _fetch_upcoming() -> dict:
+async def _fetch_upcoming() -> dict:
     """Check next 2 days for upcoming games if none today."""
-    from nba_api.stats.endpoints import scoreboardv2
-
-    # ScoreboardV2 game_header has team IDs but not abbreviations —
-    # map them via the GAMECODE column (format: YYYYMMDD/AWYHOM).
-    _TEAM_ID_TO_ABBR: dict[int, str] = {
-        1610612737: "ATL", 1610612738: "BOS", 1610612751: "BKN",
-        1610612766: "CHA", 1610612741: "CHI", 1610612739: "CLE",
-        1610612742: "DAL", 1610612743: "DEN", 1610612765: "DET",
-        1610612744: "GSW", 1610612745: "HOU", 1610612754: "IND",
-        1610612746: "LAC", 1610612747: "LAL", 1610612763: "MEM",
-        1610612748: "MIA", 1610612749: "MIL", 1610612750: "MIN",
-        1610612740: "NOP", 1610612752: "NYK", 1610612760: "OKC",
-        1610612753: "ORL", 1610612755: "PHI", 1610612756: "PHX",
-        1610612757: "POR", 1610612758: "SAC", 1610612759: "SAS",
-        1610612761: "TOR", 1610612762: "UTA", 1610612764: "WAS",
-    }
-
     today = datetime.now()
     for offset in range(1, 3):
         target = today + timedelta(days=offset)
         date_str = target.strftime("%Y-%m-%d")
 
         try:
-            sb = scoreboardv2.ScoreboardV2(game_date=date_str)
-            headers = sb.game_header.get_dict()
-            rows = headers.get("data", [])
-            col_names = headers.get("headers", [])
+            resp = await _http.get(
+                _SCOREBOARD_V2_URL,
+                params={"GameDate": date_str, "LeagueID": "00", "DayOffset": "0"},
+            )
+            resp.raise_for_status()
+            header = next(
+                (rs for rs in resp.json().get("resultSets", [])
+                 if rs.get("name") == "GameHeader"),
+                {},
+            )
+            rows = header.get("rowSet", [])
+            col_names = header.get("headers", [])
 
             if not rows:
                 continue
 
+            # Resolve column positions once rather than building a
+            # dict(zip(...)) per row just to read three fields.
+            home_i = col_names.index("HOME_TEAM_ID")
+            away_i = col_names.index("VISITOR_TEAM_ID")
+            status_i = col_names.index("GAME_STATUS_TEXT")
+
             games = []
             for row in rows:
-                row_dict = dict(zip(col_names, row))
-                home_id = row_dict.get("HOME_TEAM_ID")
-                away_id = row_dict.get("VISITOR_TEAM_ID")
+                home_id = row[home_i]
+                away_id = row[away_i]
                 games.append({
                     "home_team_abbr": _TEAM_ID_TO_ABBR.get(home_id, ""),
                     "away_team_abbr": _TEAM_ID_TO_ABBR.get(away_id, ""),
@@ -79,7 +128,7 @@ def _fetch_upcoming() -> dict:
                     "away_team_id": away_id,
                     "home_pts": None,
                     "away_pts": None,
-                    "game_status_text": row_dict.get("GAME_STATUS_TEXT", ""),
+                    "game_status_text": row[status_i],
                 })
 
             if games:
@@ -156,14 +205,17 @@ def _fetch_recent() -> dict:
     latest, label, df = max(found, key=lambda r: r[0])
     slate = df[df["GAME_DATE"].astype(str) == latest]
 
-    # One row per team per game — pair them on GAME_ID
+    # One row per team per game — pair them on GAME_ID. itertuples over just
+    # the needed columns: plain tuples, no per-row Series allocation.
     by_game: dict[str, dict] = {}
-    for _, r in slate.iterrows():
-        game = by_game.setdefault(r["GAME_ID"], {})
-        side = "home" if " vs. " in str(r["MATCHUP"]) else "away"
-        game[f"{side}_team_abbr"] = r["TEAM_ABBREVIATION"]
-        game[f"{side}_team_id"] = int(r["TEAM_ID"])
-        game[f"{side}_pts"] = int(r["PTS"]) if r["PTS"] == r["PTS"] else None
+    cols = ["GAME_ID", "MATCHUP", "TEAM_ABBREVIATION", "TEAM_ID", "PTS"]
+    for game_id, matchup, abbr, team_id, pts in slate[cols].itertuples(
+            index=False, name=None):
+        game = by_game.setdefault(game_id, {})
+        side = "home" if " vs. " in str(matchup) else "away"
+        game[f"{side}_team_abbr"] = abbr
+        game[f"{side}_team_id"] = int(team_id)
+        game[f"{side}_pts"] = int(pts) if pts == pts else None
 
     games = [
         {**g, "game_status_text": "Final"}
@@ -181,27 +233,81 @@ def _fetch_recent() -> dict:
             "context": "recent", "kind": label, "played_on": latest[:10]}
 
 
-async def get_scores() -> dict:
-    """Get current scores with caching."""
-    global _cache
+async def _refresh() -> dict:
+    """Run the fetch stages and publish the winner to the cache.
 
-    now = time.time()
-    if _cache and (now - _cache[0]) < _CACHE_TTL:
-        return _cache[1]
+    Each stage gets its own guard: the live scoreboard endpoint raises
+    outright in the offseason, and a single try block around all three
+    would skip the fallbacks entirely.
+    """
+    global _cache
 
-    # Each stage gets its own guard: the live scoreboard endpoint raises
-    # outright in the offseason, and a single try block around all three
-    # would skip the fallbacks entirely.
     result = {"games": [], "label": "Today", "context": "none"}
-    for fetch in (_fetch_scoreboard_today, _fetch_upcoming, _fetch_recent):
-        try:
-            staged = await asyncio.to_thread(fetch)
-        except Exception:
-            logger.warning("Scores stage %s failed", fetch.__name__, exc_info=True)
+
+    # The two HTTP stages run concurrently — the upcoming lookup prewarms the
+    # fallback so an empty live slate costs no extra round trip.
+    staged_results = await asyncio.gather(
+        _fetch_scoreboard_today(), _fetch_upcoming(), return_exceptions=True
+    )
+    names = ("_fetch_scoreboard_today", "_fetch_upcoming")
+    chosen = None
+    for name, staged in zip(names, staged_results):
+        if isinstance(staged, BaseException):
+            logger.warning("Scores stage %s failed", name, exc_info=staged)
             continue
         if staged.get("games"):
-            result = staged
+            chosen = staged
             break
 
-    _cache = (now, result)
+    if chosen is None:
+        # Last resort still goes through nba_api's pandas machinery — keep it
+        # off the event loop.
+        try:
+            staged = await asyncio.to_thread(_fetch_recent)
+            if staged.get("games"):
+                chosen = staged
+        except Exception:
+            logger.warning("Scores stage _fetch_recent failed", exc_info=True)
+
+    if chosen is not None:
+        result = chosen
+
+    _cache = (time.time(), result)
     return result
+
+
+async def _refresh_single_flight() -> dict:
+    """One caller runs the refresh; concurrent callers await its Future."""
+    global _inflight
+
+    if _inflight is not None:
+        return await _inflight
+
+    _inflight = asyncio.get_running_loop().create_future()
+    try:
+        result = await _refresh()
+        _inflight.set_result(result)
+        return result
+    except BaseException as exc:
+        _inflight.set_exception(exc)
+        raise
+    finally:
+        _inflight = None
+
+
+async def get_scores() -> dict:
+    """Get current scores with caching."""
+    global _bg_refresh
+
+    age = (time.time() - _cache[0]) if _cache else None
+    if age is not None and age < _CACHE_TTL:
+        return _cache[1]
+
+    # Stale-while-revalidate: a recently expired cache is still fine to show
+    # now — kick off a background refresh and let the next caller see it.
+    if age is not None and age < _STALE_TTL:
+        if _inflight is None:
+            _bg_refresh = asyncio.create_task(_refresh_single_flight())
+        return _cache[1]
+
+    return await _refresh_single_flight()
@@ -146,7 +146,7 @@ async def _player_news(player_name: str, stat: str, line: float) -> dict:
                 FROM news_chunks nc
                 JOIN news_articles na ON nc.article_id = na.article_id
                 ORDER BY
-                  (nc.embedding <=> $1::vector) *
+                  (nc.embedding <=> $1::halfvec) *
                   (1.0 + GREATEST(0, EXTRACT(EPOCH FROM (NOW() - COALESCE(na.published_at, na.ingested_at)))) / 86400.0 * 0.03)
                 LIMIT 4
             """, vec_str)
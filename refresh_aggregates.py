@@ -1,95 +1,168 @@
 """
-Create and refresh materialized views for precomputed player aggregates.
+Create and refresh the precomputed aggregate layer.
+
+Player aggregates follow a sufficient-statistics layout: one wide
+materialized view per (player, season) — sums, non-null counts, maxes and
+milestone filter counts from a single scan of player_game_stats — with the
+career/season/milestone rollups defined as plain views over it. Only MVs
+that read the fact table directly are ever refreshed.
+
 Run: python refresh_aggregates.py
 Requires: DATABASE_URL in environment or .env
 """
 
+import asyncio
 import os
 
-import psycopg2
+import asyncpg
 from dotenv import load_dotenv
 
 load_dotenv()
 
-MV_CAREER_TOTALS = """
-CREATE MATERIALIZED VIEW IF NOT EXISTS mv_player_career_totals AS
+# Base aggregate: one pass over player_game_stats per (player, season), dense
+# enough that the career/season/milestone rollups become plain views over it —
+# only this MV (and the other direct fact-table MVs) ever needs a REFRESH.
+# Changing this definition? Remember the CREATE IF NOT EXISTS gotcha: drop the
+# old view by hand first.
+MV_SEASON_AGG = """
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_player_season_agg AS
+SELECT
+    player_id,
+    season_id,
+    COUNT(*)   AS games,
+    -- Per-stat non-null counts: the stat columns are nullable, and the
+    -- derived averages must match AVG() semantics (divide by non-null rows,
+    -- not by games played).
+    COUNT(pts) AS n_pts,
+    COUNT(reb) AS n_reb,
+    COUNT(ast) AS n_ast,
+    COUNT(stl) AS n_stl,
+    COUNT(blk) AS n_blk,
+    SUM(pts)   AS sum_pts,
+    SUM(reb)   AS sum_reb,
+    SUM(ast)   AS sum_ast,
+    SUM(stl)   AS sum_stl,
+    SUM(blk)   AS sum_blk,
+    SUM(fgm)   AS sum_fgm,
+    SUM(fga)   AS sum_fga,
+    SUM(fg3m)  AS sum_fg3m,
+    SUM(fg3a)  AS sum_fg3a,
+    SUM(ftm)   AS sum_ftm,
+    SUM(fta)   AS sum_fta,
+    MAX(pts)   AS max_pts,
+    MAX(reb)   AS max_reb,
+    MAX(ast)   AS max_ast,
+    COUNT(*) FILTER (WHERE pts >= 20) AS games_20_plus_pts,
+    COUNT(*) FILTER (WHERE pts >= 30) AS games_30_plus_pts,
+    COUNT(*) FILTER (WHERE pts >= 40) AS games_40_plus_pts,
+    COUNT(*) FILTER (WHERE pts >= 50) AS games_50_plus_pts,
+    COUNT(*) FILTER (WHERE pts >= 60) AS games_60_plus_pts,
+    COUNT(*) FILTER (WHERE pts >= 10 AND reb >= 10 AND ast >= 10)
+                                      AS triple_doubles,
+    COUNT(*) FILTER (WHERE pts >= 10 AND reb >= 10)
+                                      AS double_doubles_pts_reb,
+    COUNT(*) FILTER (WHERE pts >= 10 AND ast >= 10)
+                                      AS double_doubles_pts_ast
+FROM player_game_stats
+GROUP BY player_id, season_id;
+"""
+
+# The three rollups keep their historical mv_ names (the text-to-sql prompt
+# and chat queries reference them) but are plain views now: reading them hits
+# the small, indexed base MV, and they never need refreshing. Deployments
+# where they still exist as materialized views self-migrate via the DO block
+# below — a bare DROP MATERIALIZED VIEW IF EXISTS would break once they are
+# plain views.
+DROP_LEGACY_ROLLUP_MVS = """
+DO $$
+DECLARE
+    v text;
+BEGIN
+    FOREACH v IN ARRAY ARRAY['mv_player_career_totals',
+                             'mv_player_season_averages',
+                             'mv_player_milestone_games'] LOOP
+        IF EXISTS (SELECT FROM pg_matviews WHERE matviewname = v) THEN
+            EXECUTE format('DROP MATERIALIZED VIEW %I', v);
+        END IF;
+    END LOOP;
+END $$;
+"""
+
+VIEW_CAREER_TOTALS = """
+CREATE OR REPLACE VIEW mv_player_career_totals AS
 SELECT
     p.player_id,
     p.display_name,
     p.is_active,
-    COUNT(*)                          AS games_played,
-    SUM(s.pts)                        AS total_pts,
-    ROUND(AVG(s.pts)::numeric, 1)     AS ppg,
-    ROUND(AVG(s.reb)::numeric, 1)     AS rpg,
-    ROUND(AVG(s.ast)::numeric, 1)     AS apg,
-    ROUND(AVG(s.stl)::numeric, 1)     AS spg,
-    ROUND(AVG(s.blk)::numeric, 1)     AS bpg,
+    SUM(a.games)::bigint               AS games_played,
+    SUM(a.sum_pts)::bigint             AS total_pts,
+    ROUND(SUM(a.sum_pts)::numeric / NULLIF(SUM(a.n_pts), 0), 1)  AS ppg,
+    ROUND(SUM(a.sum_reb)::numeric / NULLIF(SUM(a.n_reb), 0), 1)  AS rpg,
+    ROUND(SUM(a.sum_ast)::numeric / NULLIF(SUM(a.n_ast), 0), 1)  AS apg,
+    ROUND(SUM(a.sum_stl)::numeric / NULLIF(SUM(a.n_stl), 0), 1)  AS spg,
+    ROUND(SUM(a.sum_blk)::numeric / NULLIF(SUM(a.n_blk), 0), 1)  AS bpg,
     ROUND(
-        CASE WHEN SUM(s.fga) > 0 THEN SUM(s.fgm)::numeric / SUM(s.fga) ELSE NULL END,
+        CASE WHEN SUM(a.sum_fga) > 0 THEN SUM(a.sum_fgm)::numeric / SUM(a.sum_fga) ELSE NULL END,
         3
     )                                  AS career_fg_pct,
     ROUND(
-        CASE WHEN SUM(s.fg3a) > 0 THEN SUM(s.fg3m)::numeric / SUM(s.fg3a) ELSE NULL END,
+        CASE WHEN SUM(a.sum_fg3a) > 0 THEN SUM(a.sum_fg3m)::numeric / SUM(a.sum_fg3a) ELSE NULL END,
         3
     )                                  AS career_fg3_pct,
     ROUND(
-        CASE WHEN SUM(s.fta) > 0 THEN SUM(s.ftm)::numeric / SUM(s.fta) ELSE NULL END,
+        CASE WHEN SUM(a.sum_fta) > 0 THEN SUM(a.sum_ftm)::numeric / SUM(a.sum_fta) ELSE NULL END,
         3
     )                                  AS career_ft_pct,
-    MAX(s.pts)                         AS career_high_pts,
-    MAX(s.reb)                         AS career_high_reb,
-    MAX(s.ast)                         AS career_high_ast
-FROM player_game_stats s
+    MAX(a.max_pts)                     AS career_high_pts,
+    MAX(a.max_reb)                     AS career_high_reb,
+    MAX(a.max_ast)                     AS career_high_ast
+FROM mv_player_season_agg a
 JOIN players p USING (player_id)
 GROUP BY p.player_id, p.display_name, p.is_active;
 """
 
-MV_SEASON_AVERAGES = """
-CREATE MATERIALIZED VIEW IF NOT EXISTS mv_player_season_averages AS
+VIEW_SEASON_AVERAGES = """
+CREATE OR REPLACE VIEW mv_player_season_averages AS
 SELECT
     p.player_id,
     p.display_name,
-    s.season_id,
-    COUNT(*)                          AS games_played,
-    ROUND(AVG(s.pts)::numeric, 1)     AS ppg,
-    ROUND(AVG(s.reb)::numeric, 1)     AS rpg,
-    ROUND(AVG(s.ast)::numeric, 1)     AS apg,
-    ROUND(AVG(s.stl)::numeric, 1)     AS spg,
-    ROUND(AVG(s.blk)::numeric, 1)     AS bpg,
+    a.season_id,
+    a.games                            AS games_played,
+    ROUND(a.sum_pts::numeric / NULLIF(a.n_pts, 0), 1)  AS ppg,
+    ROUND(a.sum_reb::numeric / NULLIF(a.n_reb, 0), 1)  AS rpg,
+    ROUND(a.sum_ast::numeric / NULLIF(a.n_ast, 0), 1)  AS apg,
+    ROUND(a.sum_stl::numeric / NULLIF(a.n_stl, 0), 1)  AS spg,
+    ROUND(a.sum_blk::numeric / NULLIF(a.n_blk, 0), 1)  AS bpg,
     ROUND(
-        CASE WHEN SUM(s.fga) > 0 THEN SUM(s.fgm)::numeric / SUM(s.fga) ELSE NULL END,
+        CASE WHEN a.sum_fga > 0 THEN a.sum_fgm::numeric / a.sum_fga ELSE NULL END,
         3
     )                                  AS fg_pct,
     ROUND(
-        CASE WHEN SUM(s.fg3a) > 0 THEN SUM(s.fg3m)::numeric / SUM(s.fg3a) ELSE NULL END,
+        CASE WHEN a.sum_fg3a > 0 THEN a.sum_fg3m::numeric / a.sum_fg3a ELSE NULL END,
         3
     )                                  AS fg3_pct,
     ROUND(
-        CASE WHEN SUM(s.fta) > 0 THEN SUM(s.ftm)::numeric / SUM(s.fta) ELSE NULL END,
+        CASE WHEN a.sum_fta > 0 THEN a.sum_ftm::numeric / a.sum_fta ELSE NULL END,
         3
     )                                  AS ft_pct
-FROM player_game_stats s
-JOIN players p USING (player_id)
-GROUP BY p.player_id, p.display_name, s.season_id;
+FROM mv_player_season_agg a
+JOIN players p USING (player_id);
 """
 
-MV_MILESTONE_GAMES = """
-CREATE MATERIALIZED VIEW IF NOT EXISTS mv_player_milestone_games AS
+VIEW_MILESTONE_GAMES = """
+CREATE OR REPLACE VIEW mv_player_milestone_games AS
 SELECT
     p.player_id,
     p.display_name,
-    COUNT(*) FILTER (WHERE s.pts >= 20) AS games_20_plus_pts,
-    COUNT(*) FILTER (WHERE s.pts >= 30) AS games_30_plus_pts,
-    COUNT(*) FILTER (WHERE s.pts >= 40) AS games_40_plus_pts,
-    COUNT(*) FILTER (WHERE s.pts >= 50) AS games_50_plus_pts,
-    COUNT(*) FILTER (WHERE s.pts >= 60) AS games_60_plus_pts,
-    COUNT(*) FILTER (WHERE s.pts >= 10 AND s.reb >= 10 AND s.ast >= 10)
-                                         AS triple_doubles,
-    COUNT(*) FILTER (WHERE s.pts >= 10 AND s.reb >= 10)
-                                         AS double_doubles_pts_reb,
-    COUNT(*) FILTER (WHERE s.pts >= 10 AND s.ast >= 10)
-                                         AS double_doubles_pts_ast
-FROM player_game_stats s
+    SUM(a.games_20_plus_pts)::bigint       AS games_20_plus_pts,
+    SUM(a.games_30_plus_pts)::bigint       AS games_30_plus_pts,
+    SUM(a.games_40_plus_pts)::bigint       AS games_40_plus_pts,
+    SUM(a.games_50_plus_pts)::bigint       AS games_50_plus_pts,
+    SUM(a.games_60_plus_pts)::bigint       AS games_60_plus_pts,
+    SUM(a.triple_doubles)::bigint          AS triple_doubles,
+    SUM(a.double_doubles_pts_reb)::bigint  AS double_doubles_pts_reb,
+    SUM(a.double_doubles_pts_ast)::bigint  AS double_doubles_pts_ast
+FROM mv_player_season_agg a
 JOIN players p USING (player_id)
 GROUP BY p.player_id, p.display_name;
 """
@@ -109,55 +182,88 @@ FROM team_games;
 MV_PLAYER_PROP_HIT_RATES = """
 CREATE MATERIALIZED VIEW IF NOT EXISTS mv_player_prop_hit_rates AS
 WITH recent_games AS (
+    -- LATERAL top-K: the planner walks idx_pgs_player_gamedate_desc and stops
+    -- after 20 rows per player instead of sorting every game of the season.
     SELECT
-        s.player_id,
+        p.player_id,
         p.display_name,
-        p.is_active,
-        s.pts, s.reb, s.ast, s.fg3m,
-        s.pts + s.reb + s.ast AS pra,
-        ROW_NUMBER() OVER (PARTITION BY s.player_id ORDER BY s.game_date DESC) AS rn
-    FROM player_game_stats s
-    JOIN players p USING (player_id)
-    WHERE s.season_id = (SELECT MAX(season_id) FROM player_game_stats)
-      AND p.is_active = true
+        g.pts, g.reb, g.ast, g.fg3m,
+        g.pts + g.reb + g.ast AS pra,
+        g.rn
+    FROM players p
+    CROSS JOIN LATERAL (
+        SELECT s.pts, s.reb, s.ast, s.fg3m,
+               ROW_NUMBER() OVER (ORDER BY s.game_date DESC) AS rn
+        FROM player_game_stats s
+        WHERE s.player_id = p.player_id
+          AND s.season_id = (SELECT MAX(season_id) FROM player_game_stats)
+        ORDER BY s.game_date DESC
+        LIMIT 20
+    ) g
+    WHERE p.is_active = true
+),
+flagged AS (
+    -- Each threshold is evaluated once per row here; the aggregation below
+    -- just sums precomputed 0/1 ints instead of re-walking ~30 FILTER
+    -- predicates per row. IS TRUE keeps NULL stats counting as a miss,
+    -- matching COUNT(*) FILTER semantics.
+    SELECT
+        player_id, display_name, rn, pts, reb, ast, fg3m, pra,
+        (rn <= 10)::int          AS l10,
+        ((pts >= 15) IS TRUE)::int  AS pts_15,
+        ((pts >= 20) IS TRUE)::int  AS pts_20,
+        ((pts >= 25) IS TRUE)::int  AS pts_25,
+        ((pts >= 30) IS TRUE)::int  AS pts_30,
+        ((reb >= 6) IS TRUE)::int   AS reb_6,
+        ((reb >= 8) IS TRUE)::int   AS reb_8,
+        ((reb >= 10) IS TRUE)::int  AS reb_10,
+        ((ast >= 4) IS TRUE)::int   AS ast_4,
+        ((ast >= 6) IS TRUE)::int   AS ast_6,
+        ((ast >= 8) IS TRUE)::int   AS ast_8,
+        ((fg3m >= 2) IS TRUE)::int  AS fg3m_2,
+        ((fg3m >= 3) IS TRUE)::int  AS fg3m_3,
+        ((fg3m >= 4) IS TRUE)::int  AS fg3m_4,
+        ((pra >= 30) IS TRUE)::int  AS pra_30,
+        ((pra >= 40) IS TRUE)::int  AS pra_40
+    FROM recent_games
 )
 SELECT
     player_id,
     display_name,
     -- Hit counts over last 10 games
-    COUNT(*) FILTER (WHERE rn <= 10)                              AS games_last_10,
-    COUNT(*) FILTER (WHERE rn <= 10 AND pts >= 15)                AS pts_15_hit_last10,
-    COUNT(*) FILTER (WHERE rn <= 10 AND pts >= 20)                AS pts_20_hit_last10,
-    COUNT(*) FILTER (WHERE rn <= 10 AND pts >= 25)                AS pts_25_hit_last10,
-    COUNT(*) FILTER (WHERE rn <= 10 AND pts >= 30)                AS pts_30_hit_last10,
-    COUNT(*) FILTER (WHERE rn <= 10 AND reb >= 6)                 AS reb_6_hit_last10,
-    COUNT(*) FILTER (WHERE rn <= 10 AND reb >= 8)                 AS reb_8_hit_last10,
-    COUNT(*) FILTER (WHERE rn <= 10 AND reb >= 10)                AS reb_10_hit_last10,
-    COUNT(*) FILTER (WHERE rn <= 10 AND ast >= 4)                 AS ast_4_hit_last10,
-    COUNT(*) FILTER (WHERE rn <= 10 AND ast >= 6)                 AS ast_6_hit_last10,
-    COUNT(*) FILTER (WHERE rn <= 10 AND ast >= 8)                 AS ast_8_hit_last10,
-    COUNT(*) FILTER (WHERE rn <= 10 AND fg3m >= 2)                AS fg3m_2_hit_last10,
-    COUNT(*) FILTER (WHERE rn <= 10 AND fg3m >= 3)                AS fg3m_3_hit_last10,
-    COUNT(*) FILTER (WHERE rn <= 10 AND fg3m >= 4)                AS fg3m_4_hit_last10,
-    COUNT(*) FILTER (WHERE rn <= 10 AND pra >= 30)                AS pra_30_hit_last10,
-    COUNT(*) FILTER (WHERE rn <= 10 AND pra >= 40)                AS pra_40_hit_last10,
-    -- Hit counts over last 20 games
-    COUNT(*) FILTER (WHERE rn <= 20)                              AS games_last_20,
-    COUNT(*) FILTER (WHERE rn <= 20 AND pts >= 15)                AS pts_15_hit_last20,
-    COUNT(*) FILTER (WHERE rn <= 20 AND pts >= 20)                AS pts_20_hit_last20,
-    COUNT(*) FILTER (WHERE rn <= 20 AND pts >= 25)                AS pts_25_hit_last20,
-    COUNT(*) FILTER (WHERE rn <= 20 AND pts >= 30)                AS pts_30_hit_last20,
-    COUNT(*) FILTER (WHERE rn <= 20 AND reb >= 6)                 AS reb_6_hit_last20,
-    COUNT(*) FILTER (WHERE rn <= 20 AND reb >= 8)                 AS reb_8_hit_last20,
-    COUNT(*) FILTER (WHERE rn <= 20 AND reb >= 10)                AS reb_10_hit_last20,
-    COUNT(*) FILTER (WHERE rn <= 20 AND ast >= 4)                 AS ast_4_hit_last20,
-    COUNT(*) FILTER (WHERE rn <= 20 AND ast >= 6)                 AS ast_6_hit_last20,
-    COUNT(*) FILTER (WHERE rn <= 20 AND ast >= 8)                 AS ast_8_hit_last20,
-    COUNT(*) FILTER (WHERE rn <= 20 AND fg3m >= 2)                AS fg3m_2_hit_last20,
-    COUNT(*) FILTER (WHERE rn <= 20 AND fg3m >= 3)                AS fg3m_3_hit_last20,
-    COUNT(*) FILTER (WHERE rn <= 20 AND fg3m >= 4)                AS fg3m_4_hit_last20,
-    COUNT(*) FILTER (WHERE rn <= 20 AND pra >= 30)                AS pra_30_hit_last20,
-    COUNT(*) FILTER (WHERE rn <= 20 AND pra >= 40)                AS pra_40_hit_last20,
+    SUM(l10)             AS games_last_10,
+    SUM(l10 * pts_15)    AS pts_15_hit_last10,
+    SUM(l10 * pts_20)    AS pts_20_hit_last10,
+    SUM(l10 * pts_25)    AS pts_25_hit_last10,
+    SUM(l10 * pts_30)    AS pts_30_hit_last10,
+    SUM(l10 * reb_6)     AS reb_6_hit_last10,
+    SUM(l10 * reb_8)     AS reb_8_hit_last10,
+    SUM(l10 * reb_10)    AS reb_10_hit_last10,
+    SUM(l10 * ast_4)     AS ast_4_hit_last10,
+    SUM(l10 * ast_6)     AS ast_6_hit_last10,
+    SUM(l10 * ast_8)     AS ast_8_hit_last10,
+    SUM(l10 * fg3m_2)    AS fg3m_2_hit_last10,
+    SUM(l10 * fg3m_3)    AS fg3m_3_hit_last10,
+    SUM(l10 * fg3m_4)    AS fg3m_4_hit_last10,
+    SUM(l10 * pra_30)    AS pra_30_hit_last10,
+    SUM(l10 * pra_40)    AS pra_40_hit_last10,
+    -- Hit counts over last 20 games (every row here is within the last 20)
+    COUNT(*)             AS games_last_20,
+    SUM(pts_15)          AS pts_15_hit_last20,
+    SUM(pts_20)          AS pts_20_hit_last20,
+    SUM(pts_25)          AS pts_25_hit_last20,
+    SUM(pts_30)          AS pts_30_hit_last20,
+    SUM(reb_6)           AS reb_6_hit_last20,
+    SUM(reb_8)           AS reb_8_hit_last20,
+    SUM(reb_10)          AS reb_10_hit_last20,
+    SUM(ast_4)           AS ast_4_hit_last20,
+    SUM(ast_6)           AS ast_6_hit_last20,
+    SUM(ast_8)           AS ast_8_hit_last20,
+    SUM(fg3m_2)          AS fg3m_2_hit_last20,
+    SUM(fg3m_3)          AS fg3m_3_hit_last20,
+    SUM(fg3m_4)          AS fg3m_4_hit_last20,
+    SUM(pra_30)          AS pra_30_hit_last20,
+    SUM(pra_40)          AS pra_40_hit_last20,
     -- Last 10 averages and consistency
     ROUND(AVG(pts) FILTER (WHERE rn <= 10)::numeric, 1)          AS avg_pts_last10,
     ROUND(STDDEV(pts) FILTER (WHERE rn <= 10)::numeric, 1)       AS stddev_pts_last10,
@@ -173,8 +279,7 @@ SELECT
     MAX(ast) FILTER (WHERE rn <= 10)                              AS max_ast_last10,
     ROUND(AVG(fg3m) FILTER (WHERE rn <= 10)::numeric, 1)         AS avg_fg3m_last10,
     ROUND(AVG(pra) FILTER (WHERE rn <= 10)::numeric, 1)          AS avg_pra_last10
-FROM recent_games
-WHERE rn <= 20
+FROM flagged
 GROUP BY player_id, display_name;
 """
 
@@ -183,7 +288,7 @@ CREATE MATERIALIZED VIEW IF NOT EXISTS mv_player_home_away_splits AS
 SELECT
     s.player_id,
     p.display_name,
-    CASE WHEN s.matchup LIKE '%vs.%' THEN 'Home' ELSE 'Away' END AS location,
+    CASE WHEN s.is_home THEN 'Home' ELSE 'Away' END AS location,
     COUNT(*)                                      AS games,
     ROUND(AVG(s.pts)::numeric, 1)                 AS ppg,
     ROUND(AVG(s.reb)::numeric, 1)                 AS rpg,
@@ -198,19 +303,16 @@ FROM player_game_stats s
 JOIN players p USING (player_id)
 WHERE s.season_id = (SELECT MAX(season_id) FROM player_game_stats)
 GROUP BY s.player_id, p.display_name,
-         CASE WHEN s.matchup LIKE '%vs.%' THEN 'Home' ELSE 'Away' END;
+         CASE WHEN s.is_home THEN 'Home' ELSE 'Away' END;
 """
 
 MV_TEAM_DEFENSIVE_RATINGS = """
 CREATE MATERIALIZED VIEW IF NOT EXISTS mv_team_defensive_ratings AS
 WITH opponent_stats AS (
+    -- opponent_abbr is a generated column on player_game_stats — no string
+    -- parsing at refresh time.
     SELECT
-        CASE
-            WHEN s.matchup LIKE '%@%' THEN
-                SPLIT_PART(REPLACE(s.matchup, s.team_abbr || ' @ ', ''), ' ', 1)
-            ELSE
-                SPLIT_PART(REPLACE(s.matchup, s.team_abbr || ' vs. ', ''), ' ', 1)
-        END AS opponent_abbr,
+        s.opponent_abbr,
         s.pts, s.reb, s.ast, s.fg3m
     FROM player_game_stats s
     WHERE s.season_id = (SELECT MAX(season_id) FROM player_game_stats)
@@ -230,26 +332,93 @@ GROUP BY t.team_id, t.abbreviation, t.full_name;
 """
 
 UNIQUE_INDEXES = [
-    "CREATE UNIQUE INDEX IF NOT EXISTS mv_pct_pk ON mv_player_career_totals (player_id);",
-    "CREATE UNIQUE INDEX IF NOT EXISTS mv_psa_pk ON mv_player_season_averages (player_id, season_id);",
-    "CREATE UNIQUE INDEX IF NOT EXISTS mv_pmg_pk ON mv_player_milestone_games (player_id);",
+    "CREATE UNIQUE INDEX IF NOT EXISTS mv_psagg_pk ON mv_player_season_agg (player_id, season_id);",
     "CREATE UNIQUE INDEX IF NOT EXISTS mv_tb2b_pk ON mv_team_back_to_backs (team_id, game_id);",
     "CREATE UNIQUE INDEX IF NOT EXISTS mv_pphr_pk ON mv_player_prop_hit_rates (player_id);",
     "CREATE UNIQUE INDEX IF NOT EXISTS mv_phas_pk ON mv_player_home_away_splits (player_id, location);",
     "CREATE UNIQUE INDEX IF NOT EXISTS mv_tdr_pk ON mv_team_defensive_ratings (team_id);",
 ]
 
+# Incremental view maintenance (pg_ivm / create_immv) was evaluated as an
+# alternative to full refreshes: it would keep the rollups current on every
+# insert instead of rescanning ~1.45M rows. Rejected for now — the deployment
+# image (pgvector/pgvector:pg17) doesn't ship the extension, managed Postgres
+# offerings rarely allow it, and its per-row triggers would tax the COPY bulk
+# loads in sync_player_stats far more often than the views are read. The
+# staged parallel refresh below keeps wall time near max(view) instead.
+#
+# Refresh order: REFRESH ... CONCURRENTLY only locks its own MV, so each view
+# runs on its own connection and wall time is ~max(view) not sum(view). Only
+# the MVs that scan the fact table directly need refreshing — the career/
+# season/milestone rollups are plain views over mv_player_season_agg. The two
+# biggest (window function / DISTINCT over the whole table) go first so they
+# overlap the small ones.
 VIEWS = [
-    "mv_player_career_totals",
-    "mv_player_season_averages",
-    "mv_player_milestone_games",
-    "mv_team_back_to_backs",
     "mv_player_prop_hit_rates",
+    "mv_team_back_to_backs",
+    "mv_player_season_agg",
     "mv_player_home_away_splits",
     "mv_team_defensive_ratings",
 ]
 
 
+# All setup DDL ships to the server as one multi-statement string — a single
+# round trip via the simple query protocol, which matters on a remote
+# database. mv_player_season_agg comes first: the three rollup views select
+# from it.
+SETUP_DDL = "\n".join([
+    MV_SEASON_AGG,
+    DROP_LEGACY_ROLLUP_MVS,
+    VIEW_CAREER_TOTALS,
+    VIEW_SEASON_AVERAGES,
+    VIEW_MILESTONE_GAMES,
+    MV_TEAM_BACK_TO_BACKS,
+    MV_PLAYER_PROP_HIT_RATES,
+    MV_PLAYER_HOME_AWAY_SPLITS,
+    MV_TEAM_DEFENSIVE_RATINGS,
+    *UNIQUE_INDEXES,
+])
+
+
+def _asyncpg_dsn(database_url: str) -> str:
+    """Convert DATABASE_URL to asyncpg-compatible DSN if needed."""
+    if database_url.startswith("postgresql://"):
+        database_url = database_url.replace("postgresql://", "postgres://", 1)
+    return database_url
+
+
+async def _refresh_view(dsn: str, view: str) -> None:
+    """Refresh one MV on its own connection."""
+    conn = await asyncpg.connect(dsn)
+    try:
+        # Let the SELECT behind each MV use parallel workers, JIT the wide
+        # aggregate expressions on the big views, and give the group-bys room
+        # to hash in memory instead of spilling.
+        await conn.execute(
+            "SET max_parallel_workers_per_gather = 4; "
+            "SET jit = on; SET jit_above_cost = 100000; "
+            "SET work_mem = '256MB';"
+        )
+        print(f"  Refreshing {view} ...", flush=True)
+        await conn.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view};")
+    finally:
+        await conn.close()
+
+
+async def refresh_all(dsn: str) -> None:
+    conn = await asyncpg.connect(dsn)
+    try:
+        # Create materialized views and their unique indexes if they don't
+        # exist — one round trip for the whole setup phase.
+        print("Creating materialized views (if needed) ...")
+        await conn.execute(SETUP_DDL)
+    finally:
+        await conn.close()
+
+    # Refresh in parallel, one connection per view.
+    await asyncio.gather(*(_refresh_view(dsn, view) for view in VIEWS))
+
+
 def main() -> None:
     database_url = os.getenv("DATABASE_URL")
     if not database_url:
@@ -258,30 +427,7 @@ def main() -> None:
             "You can put it in a .env file."
         )
 
-    conn = psycopg2.connect(database_url)
-    conn.autocommit = True
-
-    with conn.cursor() as cur:
-        # Create materialized views if they don't exist
-        print("Creating materialized views (if needed) ...")
-        cur.execute(MV_CAREER_TOTALS)
-        cur.execute(MV_SEASON_AVERAGES)
-        cur.execute(MV_MILESTONE_GAMES)
-        cur.execute(MV_TEAM_BACK_TO_BACKS)
-        cur.execute(MV_PLAYER_PROP_HIT_RATES)
-        cur.execute(MV_PLAYER_HOME_AWAY_SPLITS)
-        cur.execute(MV_TEAM_DEFENSIVE_RATINGS)
-
-        # Create unique indexes for CONCURRENTLY refresh
-        for idx_sql in UNIQUE_INDEXES:
-            cur.execute(idx_sql)
-
-        # Refresh concurrently
-        for view in VIEWS:
-            print(f"  Refreshing {view} ...", flush=True)
-            cur.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view};")
-
-    conn.close()
+    asyncio.run(refresh_all(_asyncpg_dsn(database_url)))
     print("Done.")
 
 
@@ -4,13 +4,18 @@ Run: python sync_news.py
 Requires: DATABASE_URL, OPENAI_API_KEY in environment or .env
 """
 
+import asyncio
 import os
 import time
 from datetime import datetime, timezone
 
 import feedparser
+import httpx
+import numpy as np
 import psycopg2
 import tiktoken
+from pgvector.psycopg2 import register_vector
+from psycopg2.extras import execute_values
 import trafilatura
 from openai import OpenAI
 from dotenv import load_dotenv
@@ -30,6 +35,38 @@ CHUNK_SIZE = 500       # tokens
 CHUNK_OVERLAP = 50     # tokens
 EMBEDDING_MODEL = "text-embedding-3-small"
 REQUEST_DELAY_SEC = 0.3
+FETCH_CONCURRENCY = 16
+FETCH_TIMEOUT_SEC = 10.0
+
+# Some outlets 403 clients without a browser-ish UA.
+_FETCH_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
+    ),
+}
+
+
+async def _fetch_articles(urls: list[str]) -> dict[str, str | None]:
+    """Download article HTML up to FETCH_CONCURRENCY-wide in one event loop.
+
+    Only the network wait is concurrent; trafilatura extraction (CPU-bound)
+    stays in the synchronous pipeline.
+    """
+    sem = asyncio.Semaphore(FETCH_CONCURRENCY)
+
+    async def fetch(client: httpx.AsyncClient, url: str) -> tuple[str, str | None]:
+        async with sem:
+            try:
+                resp = await client.get(url, timeout=FETCH_TIMEOUT_SEC)
+                resp.raise_for_status()
+                return url, resp.text
+            except Exception:
+                return url, None
+
+    async with httpx.AsyncClient(headers=_FETCH_HEADERS, follow_redirects=True) as client:
+        results = await asyncio.gather(*(fetch(client, u) for u in urls))
+    return dict(results)
 
 
 def ensure_schema(conn) -> None:
@@ -46,39 +83,56 @@ def ensure_schema(conn) -> None:
             );
         """)
         cur.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+        # halfvec: 2 bytes/dim instead of 4. text-embedding-3-small loses
+        # nothing measurable at fp16, and the hnsw graph + scans halve in size.
         cur.execute("""
             CREATE TABLE IF NOT EXISTS news_chunks (
                 chunk_id    SERIAL PRIMARY KEY,
                 article_id  INT NOT NULL REFERENCES news_articles(article_id) ON DELETE CASCADE,
                 chunk_index INT NOT NULL,
                 content     TEXT NOT NULL,
-                embedding   vector(1536) NOT NULL
+                embedding   halfvec(1536) NOT NULL
             );
         """)
+        # In-place migration for deployments created when the column was fp32:
+        # the old cosine index must go first, then the column converts.
+        cur.execute("""
+            DO $$ BEGIN
+                IF EXISTS (SELECT FROM information_schema.columns
+                           WHERE table_name = 'news_chunks'
+                             AND column_name = 'embedding'
+                             AND udt_name = 'vector') THEN
+                    DROP INDEX IF EXISTS idx_chunks_embedding;
+                    ALTER TABLE news_chunks
+                    ALTER COLUMN embedding TYPE halfvec(1536)
+                    USING embedding::halfvec(1536);
+                END IF;
+            END $$;
+        """)
         cur.execute("""
             CREATE INDEX IF NOT EXISTS idx_chunks_embedding
-            ON news_chunks USING hnsw (embedding vector_cosine_ops);
+            ON news_chunks USING hnsw (embedding halfvec_cosine_ops);
         """)
         conn.commit()
 
 
 def chunk_text(text: str, enc: tiktoken.Encoding) -> list[str]:
     """Split text into chunks of ~CHUNK_SIZE tokens with CHUNK_OVERLAP overlap."""
-    tokens = enc.encode(text)
-    chunks = []
-    start = 0
-    while start < len(tokens):
-        end = start + CHUNK_SIZE
-        chunk_tokens = tokens[start:end]
-        chunks.append(enc.decode(chunk_tokens))
-        start = end - CHUNK_OVERLAP
-    return chunks
-
-
-def get_embedding(client: OpenAI, text: str) -> list[float]:
+    tokens = np.asarray(enc.encode(text), dtype=np.int32)
+    if tokens.size == 0:
+        return []
+    # All window starts at once, then one Rust-side decode_batch call instead
+    # of a Python-level decode per chunk.
+    starts = np.arange(0, tokens.size, CHUNK_SIZE - CHUNK_OVERLAP)
+    return enc.decode_batch([tokens[s:s + CHUNK_SIZE].tolist() for s in starts])
+
+
+def get_embeddings(client: OpenAI, texts: list[str]) -> list[list[float]]:
+    """Embed all chunks of one article in a single API round trip."""
     time.sleep(REQUEST_DELAY_SEC)
-    resp = client.embeddings.create(model=EMBEDDING_MODEL, input=text)
-    return resp.data[0].embedding
+    resp = client.embeddings.create(model=EMBEDDING_MODEL, input=texts)
+    # Order by the response's own index rather than trusting list order.
+    return [d.embedding for d in sorted(resp.data, key=lambda d: d.index)]
 
 
 def parse_published(entry) -> datetime | None:
@@ -101,7 +155,26 @@ def main() -> None:
         raise SystemExit("Set OPENAI_API_KEY in .env")
 
     conn = psycopg2.connect(database_url)
+    # This script commits once per article; async WAL flushing keeps those
+    # commits cheap, and a lost tail on crash just re-ingests next run.
+    with conn.cursor() as cur:
+        cur.execute("SET synchronous_commit TO OFF;")
+    conn.commit()
     ensure_schema(conn)
+    # Adapt numpy arrays to the vector type in C — after ensure_schema so the
+    # extension exists on first run.
+    register_vector(conn)
+
+    # The article insert is the one statement still executed row-at-a-time
+    # (everything else is batched); prepare it once so the server skips
+    # parse/plan on every article.
+    with conn.cursor() as cur:
+        cur.execute("""
+            PREPARE insert_article (TEXT, TEXT, TEXT, TIMESTAMPTZ, TEXT) AS
+            INSERT INTO news_articles (title, url, source, published_at, full_text)
+            VALUES ($1, $2, $3, $4, $5)
+            RETURNING article_id;
+        """)
 
     # This script runs as a scheduled subprocess, so it does NOT share the
     # server's in-memory LLM budget (app/services/llm.py). Without its own cap
@@ -124,6 +197,13 @@ def main() -> None:
     client = OpenAI(api_key=openai_key)
     enc = tiktoken.encoding_for_model("gpt-4o")
 
+    # One round trip for the dedupe set instead of a SELECT per RSS entry.
+    # The url column is UNIQUE, so a concurrent writer still can't slip a
+    # duplicate past us — the insert would just fail loudly.
+    with conn.cursor() as cur:
+        cur.execute("SELECT url FROM news_articles")
+        seen_urls = {r[0] for r in cur.fetchall()}
+
     total_articles = 0
     total_chunks = 0
 
@@ -137,25 +217,30 @@ def main() -> None:
             print(f"  Error parsing feed: {e}")
             continue
 
+        # Collect the new entries first (feeds also repeat entries across
+        # sources, so the set stays current as we insert), cap them to the
+        # remaining daily budget, and download their HTML concurrently — the
+        # per-article pipeline below then never waits on the network twice.
+        candidates = []
+        queued = set()
         for entry in feed.entries:
-            if total_articles >= remaining:
-                print(f"  Reached daily ingest cap ({daily_cap}); stopping.")
-                break
             url = getattr(entry, "link", None)
-            title = getattr(entry, "title", "Untitled")
-            if not url:
+            if not url or url in seen_urls or url in queued:
                 continue
+            queued.add(url)
+            candidates.append((url, getattr(entry, "title", "Untitled"), entry))
+        candidates = candidates[: remaining - total_articles]
+        htmls = asyncio.run(_fetch_articles([c[0] for c in candidates]))
 
-            # Check if already ingested
-            with conn.cursor() as cur:
-                cur.execute("SELECT article_id FROM news_articles WHERE url = %s", (url,))
-                if cur.fetchone():
-                    continue
+        for url, title, entry in candidates:
+            if total_articles >= remaining:
+                print(f"  Reached daily ingest cap ({daily_cap}); stopping.")
+                break
 
-            # Extract full article text
+            # Extract full article text (CPU-bound, synchronous)
+            html = htmls.get(url)
             try:
-                downloaded = trafilatura.fetch_url(url)
-                full_text = trafilatura.extract(downloaded) if downloaded else None
+                full_text = trafilatura.extract(html) if html else None
             except Exception:
                 full_text = None
 
@@ -164,28 +249,30 @@ def main() -> None:
 
             published_at = parse_published(entry)
 
-            # Insert article
+            # Insert article (statement prepared at connection open)
             with conn.cursor() as cur:
-                cur.execute("""
-                    INSERT INTO news_articles (title, url, source, published_at, full_text)
-                    VALUES (%s, %s, %s, %s, %s)
-                    RETURNING article_id
-                """, (title, url, source_name, published_at, full_text))
+                cur.execute(
+                    "EXECUTE insert_article (%s, %s, %s, %s, %s)",
+                    (title, url, source_name, published_at, full_text),
+                )
                 article_id = cur.fetchone()[0]
                 conn.commit()
+            seen_urls.add(url)
 
-            # Chunk and embed
+            # Chunk, embed the whole article in one call, insert in one batch
             chunks = chunk_text(full_text, enc)
-            for i, chunk_text_str in enumerate(chunks):
-                embedding = get_embedding(client, chunk_text_str)
-                embedding_str = "[" + ",".join(str(x) for x in embedding) + "]"
-                with conn.cursor() as cur:
-                    cur.execute("""
-                        INSERT INTO news_chunks (article_id, chunk_index, content, embedding)
-                        VALUES (%s, %s, %s, %s::vector)
-                    """, (article_id, i, chunk_text_str, embedding_str))
-                conn.commit()
-                total_chunks += 1
+            embeddings = get_embeddings(client, chunks)
+            rows = [
+                (article_id, i, chunk, np.asarray(emb, dtype=np.float16))
+                for i, (chunk, emb) in enumerate(zip(chunks, embeddings))
+            ]
+            with conn.cursor() as cur:
+                execute_values(cur, """
+                    INSERT INTO news_chunks (article_id, chunk_index, content, embedding)
+                    VALUES %s
+                """, rows)
+            conn.commit()
+            total_chunks += len(rows)
 
             total_articles += 1
             print(f"  {title[:60]}... ({len(chunks)} chunks)")
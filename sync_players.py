@@ -6,18 +6,94 @@ Requires: DATABASE_URL in environment or .env
 """
 
 import argparse
+import asyncio
+import hashlib
+import io
 import os
 import time
 
+import httpx
+import pandas as pd
 import psycopg2
 from dotenv import load_dotenv
+from psycopg2.extras import execute_values
 from nba_api.stats.static import teams as static_teams
-from nba_api.stats.endpoints import commonallplayers, commonplayerinfo
+from nba_api.stats.endpoints import commonallplayers
 
 load_dotenv()
 
 REQUEST_DELAY_SEC = 0.6
 
+# Insertable player columns, in COPY order (bio columns are filled by --bios).
+# content_hash fingerprints the roster fields so unchanged rows skip the
+# on-conflict update entirely — no WAL or index churn on a no-op rerun.
+PLAYER_COLUMNS = [
+    "player_id", "first_name", "last_name", "display_name",
+    "is_active", "from_year", "to_year", "team_id", "content_hash",
+]
+
+# Bio fetches overlap this wide, with launch slots reserved at one per
+# REQUEST_DELAY_SEC / BIO_CONCURRENCY. Reserving slots (rather than sleeping a
+# fixed delay per request) lets a slow response pay for its own spacing.
+BIO_CONCURRENCY = 8
+_bio_next_slot = 0.0
+
+
+async def _bio_throttle() -> None:
+    global _bio_next_slot
+    now = time.monotonic()
+    wait = _bio_next_slot - now
+    _bio_next_slot = max(now, _bio_next_slot) + REQUEST_DELAY_SEC / BIO_CONCURRENCY
+    if wait > 0:
+        await asyncio.sleep(wait)
+
+
+_COMMON_PLAYER_INFO_URL = "https://stats.nba.com/stats/commonplayerinfo"
+
+# stats.nba.com rejects requests without browser-ish headers (same set the
+# scores service uses).
+_NBA_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
+    ),
+    "Referer": "https://stats.nba.com/",
+    "Accept": "application/json, text/plain, */*",
+    "x-nba-stats-origin": "stats",
+    "x-nba-stats-token": "true",
+}
+
+
+async def _fetch_bios(player_ids: list[int]) -> dict[int, dict | None]:
+    """Fetch CommonPlayerInfo for every id, BIO_CONCURRENCY requests in flight."""
+    sem = asyncio.Semaphore(BIO_CONCURRENCY)
+
+    async def fetch(client: httpx.AsyncClient, pid: int) -> tuple[int, dict | None]:
+        async with sem:
+            await _bio_throttle()
+            try:
+                resp = await client.get(
+                    _COMMON_PLAYER_INFO_URL,
+                    params={"PlayerID": pid, "LeagueID": "00"},
+                )
+                resp.raise_for_status()
+                rs = next(
+                    (r for r in resp.json().get("resultSets", [])
+                     if r.get("name") == "CommonPlayerInfo"),
+                    {},
+                )
+                rows = rs.get("rowSet", [])
+                if not rows:
+                    return pid, None
+                return pid, dict(zip(rs.get("headers", []), rows[0]))
+            except Exception as e:
+                print(f"  Warning: failed to fetch bio for player_id={pid}: {e}")
+                return pid, None
+
+    async with httpx.AsyncClient(headers=_NBA_HEADERS, timeout=25.0) as client:
+        results = await asyncio.gather(*(fetch(client, p) for p in player_ids))
+    return dict(results)
+
 
 def ensure_schema(conn) -> None:
     """Create teams and players tables if they don't exist."""
@@ -43,10 +119,18 @@ def ensure_schema(conn) -> None:
                 team_id      BIGINT REFERENCES teams(team_id)
             );
         """)
+        # Lowered name as a stored generated column with a plain btree, rather
+        # than a functional index: lower() runs once per write instead of per
+        # index maintenance/evaluation. The old functional index is dropped.
+        cur.execute("""
+            ALTER TABLE players ADD COLUMN IF NOT EXISTS display_name_lower TEXT
+            GENERATED ALWAYS AS (lower(display_name)) STORED;
+        """)
         cur.execute("""
-            CREATE INDEX IF NOT EXISTS idx_players_name
-            ON players (LOWER(display_name));
+            CREATE INDEX IF NOT EXISTS idx_players_name_lower
+            ON players (display_name_lower);
         """)
+        cur.execute("DROP INDEX IF EXISTS idx_players_name;")
         # Bio columns — safe to re-run (ADD COLUMN IF NOT EXISTS)
         bio_columns = [
             ("birthdate", "DATE"),
@@ -60,30 +144,36 @@ def ensure_schema(conn) -> None:
             ("country", "TEXT"),
             ("school", "TEXT"),
         ]
-        for col_name, col_type in bio_columns:
-            cur.execute(f"ALTER TABLE players ADD COLUMN IF NOT EXISTS {col_name} {col_type};")
+        # One ALTER TABLE with every ADD COLUMN clause — a single round trip
+        # and catalog transaction instead of one per column.
+        added = bio_columns + [("content_hash", "BYTEA")]
+        cur.execute(
+            "ALTER TABLE players "
+            + ", ".join(f"ADD COLUMN IF NOT EXISTS {n} {t}" for n, t in added)
+            + ";"
+        )
         conn.commit()
 
 
 def sync_teams(conn) -> int:
     """Load all NBA teams from static data (no API call needed)."""
     all_teams = static_teams.get_teams()
+    rows = [
+        (t["id"], t["abbreviation"], t["full_name"], t["city"], t["year_founded"])
+        for t in all_teams
+    ]
     with conn.cursor() as cur:
-        for t in all_teams:
-            cur.execute("""
-                INSERT INTO teams (team_id, abbreviation, full_name, city, year_founded)
-                VALUES (%s, %s, %s, %s, %s)
-                ON CONFLICT (team_id) DO UPDATE SET
-                    abbreviation = EXCLUDED.abbreviation,
-                    full_name = EXCLUDED.full_name,
-                    city = EXCLUDED.city,
-                    year_founded = EXCLUDED.year_founded
-            """, (
-                t["id"], t["abbreviation"], t["full_name"],
-                t["city"], t["year_founded"],
-            ))
+        execute_values(cur, """
+            INSERT INTO teams (team_id, abbreviation, full_name, city, year_founded)
+            VALUES %s
+            ON CONFLICT (team_id) DO UPDATE SET
+                abbreviation = EXCLUDED.abbreviation,
+                full_name = EXCLUDED.full_name,
+                city = EXCLUDED.city,
+                year_founded = EXCLUDED.year_founded
+        """, rows)
         conn.commit()
-    return len(all_teams)
+    return len(rows)
 
 
 def sync_players(conn) -> int:
@@ -96,141 +186,182 @@ def sync_players(conn) -> int:
         print("No player data returned.")
         return 0
 
-    count = 0
+    # Vectorized parsing: one C-level pass per column instead of per-cell
+    # str()/int()/dict-key work inside an iterrows loop.
+    def int_or_null(col: str) -> pd.Series:
+        # 0/blank/garbage all mean "unknown", matching the old truthiness
+        # checks (and TEAM_ID 0 meaning "no team")
+        if col not in df.columns:
+            return pd.Series(pd.NA, index=df.index, dtype="Int64")
+        years = pd.to_numeric(df[col], errors="coerce").astype("Int64")
+        return years.where(years != 0)
+
+    display_name = df["DISPLAY_FIRST_LAST"].astype(str).str.strip()
+    names = display_name.str.split(" ", n=1, expand=True)
+    first_name = names[0].fillna("")
+    last_name = names[1].fillna("") if 1 in names.columns else ""
+
+    team_id = int_or_null("TEAM_ID")
+
+    if "ROSTERSTATUS" in df.columns:
+        is_active = pd.to_numeric(df["ROSTERSTATUS"], errors="coerce").eq(1)
+    else:
+        is_active = False
+
+    out = pd.DataFrame({
+        "player_id": pd.to_numeric(df["PERSON_ID"], errors="coerce").astype("Int64"),
+        "first_name": first_name,
+        "last_name": last_name,
+        "display_name": display_name,
+        "is_active": is_active,
+        "from_year": int_or_null("FROM_YEAR"),
+        "to_year": int_or_null("TO_YEAR"),
+        "team_id": team_id,
+    })
+
+    # Fingerprint the roster fields; rows whose hash matches what's stored
+    # are left untouched by the merge below.
+    hash_src = out.astype("string").fillna("").agg("|".join, axis=1)
+    out["content_hash"] = [
+        r"\x" + hashlib.sha1(s.encode()).hexdigest() for s in hash_src
+    ]
+
+    # COPY the whole roster into a temp table in one stream, then merge with a
+    # single INSERT ... ON CONFLICT — two statements instead of ~5000.
+    buf = io.StringIO()
+    out.to_csv(buf, index=False, header=False, na_rep=r"\N")
+    buf.seek(0)
+
+    col_list = ", ".join(PLAYER_COLUMNS)
     with conn.cursor() as cur:
-        for _, row in df.iterrows():
-            player_id = int(row["PERSON_ID"])
-            display_name = str(row["DISPLAY_FIRST_LAST"]).strip()
-            parts = display_name.split(" ", 1)
-            first_name = parts[0] if parts else ""
-            last_name = parts[1] if len(parts) > 1 else ""
-
-            # Parse from/to years
-            from_year = None
-            to_year = None
-            if "FROM_YEAR" in row and row["FROM_YEAR"]:
-                try:
-                    from_year = int(row["FROM_YEAR"])
-                except (ValueError, TypeError):
-                    pass
-            if "TO_YEAR" in row and row["TO_YEAR"]:
-                try:
-                    to_year = int(row["TO_YEAR"])
-                except (ValueError, TypeError):
-                    pass
-
-            # Determine team_id (0 means no team)
-            team_id = None
-            if "TEAM_ID" in row and row["TEAM_ID"] and int(row["TEAM_ID"]) != 0:
-                team_id = int(row["TEAM_ID"])
-
-            # Determine active status
-            is_active = False
-            if "ROSTERSTATUS" in row:
-                is_active = row["ROSTERSTATUS"] == 1 or row["ROSTERSTATUS"] == "1"
+        # On a first load into an empty table, build idx_players_name_lower
+        # once after the data lands instead of maintaining it row by row.
+        cur.execute("SELECT EXISTS (SELECT 1 FROM players)")
+        initial_load = not cur.fetchone()[0]
+        if initial_load:
+            cur.execute("DROP INDEX IF EXISTS idx_players_name_lower;")
 
+        cur.execute("""
+            CREATE TEMP TABLE tmp_players (LIKE players INCLUDING DEFAULTS)
+            ON COMMIT DROP;
+        """)
+        cur.copy_expert(
+            f"COPY tmp_players ({col_list}) "
+            r"FROM STDIN WITH (FORMAT csv, NULL '\N')",
+            buf,
+        )
+        cur.execute(f"""
+            INSERT INTO players ({col_list})
+            SELECT DISTINCT ON (player_id) {col_list}
+            FROM tmp_players
+            ON CONFLICT (player_id) DO UPDATE SET
+                first_name = EXCLUDED.first_name,
+                last_name = EXCLUDED.last_name,
+                display_name = EXCLUDED.display_name,
+                is_active = EXCLUDED.is_active,
+                from_year = EXCLUDED.from_year,
+                to_year = EXCLUDED.to_year,
+                team_id = EXCLUDED.team_id,
+                content_hash = EXCLUDED.content_hash
+            WHERE players.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+        """)
+        if initial_load:
             cur.execute("""
-                INSERT INTO players (player_id, first_name, last_name, display_name,
-                                     is_active, from_year, to_year, team_id)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (player_id) DO UPDATE SET
-                    first_name = EXCLUDED.first_name,
-                    last_name = EXCLUDED.last_name,
-                    display_name = EXCLUDED.display_name,
-                    is_active = EXCLUDED.is_active,
-                    from_year = EXCLUDED.from_year,
-                    to_year = EXCLUDED.to_year,
-                    team_id = EXCLUDED.team_id
-            """, (
-                player_id, first_name, last_name, display_name,
-                is_active, from_year, to_year, team_id,
-            ))
-            count += 1
-
+                CREATE INDEX IF NOT EXISTS idx_players_name_lower
+                ON players (display_name_lower);
+            """)
         conn.commit()
-    return count
+    return len(out)
 
 
-def sync_player_bios(conn) -> int:
-    """Fetch biographical info for active players via CommonPlayerInfo endpoint."""
+def sync_player_bios(conn, refresh: bool = False) -> int:
+    """Fetch biographical info for active players via CommonPlayerInfo endpoint.
+
+    Bios almost never change, and the players table already records which ones
+    we have — so reruns only fetch active players still missing a birthdate.
+    Pass refresh=True (--refresh-bios) to re-pull everyone, e.g. after trades.
+    """
+    where = "is_active = TRUE"
+    if not refresh:
+        where += " AND birthdate IS NULL"
     with conn.cursor() as cur:
-        cur.execute("SELECT player_id FROM players WHERE is_active = TRUE")
+        cur.execute(f"SELECT player_id FROM players WHERE {where}")
         active_ids = [row[0] for row in cur.fetchall()]
 
     if not active_ids:
-        print("No active players found — skipping bios.")
+        print("No active players missing bios — nothing to fetch.")
+        return 0
+
+    # All HTTP first (8-wide), then the DB writes.
+    bios = asyncio.run(_fetch_bios(active_ids))
+    bio_frame = pd.DataFrame([
+        {**row, "player_id": pid} for pid, row in bios.items() if row
+    ])
+    if bio_frame.empty:
         return 0
 
-    count = 0
-    total = len(active_ids)
-    for i, pid in enumerate(active_ids):
-        try:
-            time.sleep(REQUEST_DELAY_SEC)
-            info = commonplayerinfo.CommonPlayerInfo(player_id=pid)
-            df = info.get_data_frames()[0]
-            if df is None or df.empty:
-                continue
-            row = df.iloc[0]
-
-            birthdate = row.get("BIRTHDATE")
-            if birthdate and str(birthdate).strip():
-                # The API returns ISO format; keep just the date part
-                birthdate = str(birthdate).strip()[:10]
-            else:
-                birthdate = None
-
-            def _safe_int(val):
-                try:
-                    v = int(val)
-                    return v if v != 0 else None
-                except (ValueError, TypeError):
-                    return None
-
-            def _safe_str(val):
-                s = str(val).strip() if val else None
-                return s if s and s.lower() != "nan" else None
-
-            with conn.cursor() as cur:
-                cur.execute("""
-                    UPDATE players SET
-                        birthdate   = %s,
-                        height      = %s,
-                        weight      = %s,
-                        position    = %s,
-                        jersey      = %s,
-                        draft_year  = %s,
-                        draft_round = %s,
-                        draft_number = %s,
-                        country     = %s,
-                        school      = %s
-                    WHERE player_id = %s
-                """, (
-                    birthdate,
-                    _safe_str(row.get("HEIGHT")),
-                    _safe_str(row.get("WEIGHT")),
-                    _safe_str(row.get("POSITION")),
-                    _safe_str(row.get("JERSEY")),
-                    _safe_int(row.get("DRAFT_YEAR")),
-                    _safe_int(row.get("DRAFT_ROUND")),
-                    _safe_int(row.get("DRAFT_NUMBER")),
-                    _safe_str(row.get("COUNTRY")),
-                    _safe_str(row.get("SCHOOL")),
-                    pid,
-                ))
-                conn.commit()
-            count += 1
-            if (i + 1) % 50 == 0:
-                print(f"  {i + 1}/{total} bios synced ...", flush=True)
-        except Exception as e:
-            print(f"  Warning: failed to fetch bio for player_id={pid}: {e}")
-            continue
-
-    return count
+    # Vectorized cleaning — one C-level pass per column instead of the old
+    # exception-driven _safe_int/_safe_str calls per cell. Blank, "nan" and
+    # zero all normalize to NULL, matching the previous per-cell rules.
+    def clean_str(col: str) -> pd.Series:
+        if col not in bio_frame.columns:
+            return pd.Series(pd.NA, index=bio_frame.index, dtype="string")
+        s = bio_frame[col].astype("string").str.strip()
+        return s.mask((s == "") | (s.str.lower() == "nan"))
+
+    def clean_int(col: str) -> pd.Series:
+        if col not in bio_frame.columns:
+            return pd.Series(pd.NA, index=bio_frame.index, dtype="Int64")
+        n = pd.to_numeric(bio_frame[col], errors="coerce").astype("Int64")
+        return n.where(n != 0)
+
+    cleaned = pd.DataFrame({
+        "player_id": bio_frame["player_id"],
+        # The API returns ISO timestamps; keep just the date part
+        "birthdate": clean_str("BIRTHDATE").str.slice(0, 10),
+        "height": clean_str("HEIGHT"),
+        "weight": clean_str("WEIGHT"),
+        "position": clean_str("POSITION"),
+        "jersey": clean_str("JERSEY"),
+        "draft_year": clean_int("DRAFT_YEAR"),
+        "draft_round": clean_int("DRAFT_ROUND"),
+        "draft_number": clean_int("DRAFT_NUMBER"),
+        "country": clean_str("COUNTRY"),
+        "school": clean_str("SCHOOL"),
+    })
+    rows = list(zip(*(
+        cleaned[c].to_numpy(dtype=object, na_value=None) for c in cleaned.columns
+    )))
+
+    # One batched UPDATE ... FROM (VALUES ...) instead of a statement and a
+    # WAL flush per player.
+    with conn.cursor() as cur:
+        execute_values(cur, """
+            UPDATE players SET
+                birthdate   = v.birthdate::date,
+                height      = v.height,
+                weight      = v.weight,
+                position    = v.position,
+                jersey      = v.jersey,
+                draft_year  = v.draft_year::int,
+                draft_round = v.draft_round::int,
+                draft_number = v.draft_number::int,
+                country     = v.country,
+                school      = v.school
+            FROM (VALUES %s) AS v(player_id, birthdate, height, weight, position,
+                                  jersey, draft_year, draft_round, draft_number,
+                                  country, school)
+            WHERE players.player_id = v.player_id
+        """, rows)
+        conn.commit()
+    return len(rows)
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Sync NBA teams, players, and bios.")
     parser.add_argument("--bios", action="store_true", help="Also sync biographical data for active players")
+    parser.add_argument("--refresh-bios", action="store_true",
+                        help="With --bios: re-fetch bios that are already populated")
     args = parser.parse_args()
 
     database_url = os.getenv("DATABASE_URL")
@@ -241,6 +372,11 @@ def main() -> None:
         )
 
     conn = psycopg2.connect(database_url)
+    # Bulk loader: skip the synchronous WAL fsync on commit. Worst case on a
+    # crash is losing the last batch, which the next run re-fetches anyway.
+    with conn.cursor() as cur:
+        cur.execute("SET synchronous_commit TO OFF;")
+    conn.commit()
     ensure_schema(conn)
 
     print("Syncing teams ...", end=" ", flush=True)
@@ -253,7 +389,7 @@ def main() -> None:
 
     if args.bios:
         print("Syncing player bios (active players only) ...", flush=True)
-        n_bios = sync_player_bios(conn)
+        n_bios = sync_player_bios(conn, refresh=args.refresh_bios)
         print(f"{n_bios} bios synced.")
 
     conn.close()